@@ -8,14 +8,34 @@
 # Licence:     GPL V3
 #-------------------------------------------------------------------------------
 
+import numpy as np
+import openpyxl
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 import glob
+import hashlib
 import os
+import re
 import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from bisect import insort
+from operator import itemgetter
 
 # config .ini
 import configparser # Permet de parser le fichier de paramètres
 
+# compilation optionnelle de la fusion des séries
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# format des dates lues dans les fichiers excel
+FORMAT_DATE = '%d/%m/%Y %H:%M:%S'
+
 #-------------------------------------------------------------------------------
 
 def get_params(input_file):
@@ -41,6 +61,8 @@ def get_params(input_file):
     params["FICHIERS_INPUT"]=config.get('params','FICHIERS_INPUT')
     # dossier de sortie des données lues
     params["RESULTATS"]=config.get('params','RESULTATS')
+    # dossier optionnel du cache parquet des fichiers lus, pas de cache s'il n'est pas indiqué
+    params["DOSSIER_CACHE"]=config.get('params','DOSSIER_CACHE', fallback=None)
 
     # paramètres spéfifiques au format des données des fichiers excel à lire
     params[params['FORMAT_DONNEES']] = lire_param_format(config, params['FORMAT_DONNEES'])
@@ -48,6 +70,9 @@ def get_params(input_file):
 
 #-------------------------------------------------------------------------------
 
+# motif d'une ligne 'clef : valeur' du paramètre col_params
+_MOTIF_COL_PARAMS = re.compile(r'[ \t]*([^:\s][^:]*?)[ \t]*:[ \t]*(.*?)[ \t]*')
+
 def _extraire_col_params(str_colonnes):
     """Fonction interne permettant l'analyse de la chaîne de paramètres du type
     Cesse : CESSE.COMPTEUR.DEBIT.Courant_100
@@ -62,19 +87,22 @@ def _extraire_col_params(str_colonnes):
 
     Returns:
         dict: valeurs analysées rangées sous la forme 'Cesse':[val1, val2...], 'Moussoulens':[val1, val2...]
+
+    Raises:
+        ValueError: si une ligne non vide n'est pas de la forme 'clef : valeur'
     """
-    resultat = dict()
-    # extraction des infos ligne par ligne et selon les clefs incluses
+    resultat = defaultdict(list)
+    # extraction des couples clef : valeur ligne par ligne, sans les espaces en trop
     for ligne in str_colonnes.split('\n'):
-        k,v = ligne.split(':')
-        # suppression des espaces en trop
-        k = k.strip()
-        v = v.strip()
-        if k not in resultat:
-            resultat[k] = list()
+        if not ligne.strip():
+            continue
+        analyse = _MOTIF_COL_PARAMS.fullmatch(ligne)
+        if analyse is None:
+            raise ValueError(f"ligne de paramètres non valide : '{ligne}'")
+        k, v = analyse.groups()
         resultat[k].append(v)
     # fin
-    return resultat
+    return dict(resultat)
 
 def lire_param_format(config, nom_section):
     """lecture des paramètres du format excel 'SALLELES' contenant
@@ -100,6 +128,50 @@ def lire_param_format(config, nom_section):
 
 #-------------------------------------------------------------------------------
 
+def _lire_onglet_salleles(onglet, colonnes):
+    """Fonction interne de lecture directe d'un onglet au format 'SALLELES' ouvert par openpyxl :
+    ligne d'en-tête, ligne d'unités ignorée, puis dates en première colonne et valeurs numériques
+
+    Args:
+        onglet (openpyxl worksheet): onglet à lire
+        colonnes (list): noms des colonnes à extraire
+
+    Returns:
+        DataFrame: valeurs des colonnes en simple précision, indexées par les dates lues non converties,
+        ou None si l'onglet doit être interprété par pandas : colonne demandée absente de l'en-tête brut
+        (en-têtes répétés renommés 'A.1'... par pandas) ou valeur non numérique (texte du type '#N/A')
+
+    Raises:
+        ValueError: si l'onglet est vide
+    """
+    # les dimensions enregistrées dans le fichier peuvent être fausses (fichiers non produits par excel) :
+    # elles sont ignorées pour lire toutes les lignes et colonnes, comme le fait pandas
+    onglet.reset_dimensions()
+    lignes = onglet.iter_rows(values_only=True)
+    entete = next(lignes, None)
+    if entete is None:
+        raise ValueError(f"onglet {onglet.title} vide")
+    # position des colonnes à extraire
+    if any(col not in entete for col in colonnes):
+        return None
+    positions = [entete.index(col) for col in colonnes]
+    # ligne des unités ignorée
+    next(lignes, None)
+    dates = list()
+    valeurs = list()
+    for ligne in lignes:
+        # lignes entièrement vides ignorées
+        if all(v is None for v in ligne):
+            continue
+        dates.append(ligne[0])
+        valeurs.append([ligne[pos] for pos in positions])
+    # les cellules vides deviennent des NaN lors de la conversion
+    try:
+        data = np.array(valeurs, dtype=np.float32).reshape(len(valeurs), len(colonnes))
+    except (TypeError, ValueError):
+        return None
+    return pd.DataFrame(data, index=pd.Index(dates, name=entete[0]), columns=colonnes)
+
 def lire_fic_salleles(fic, dico_param):
     """lecture du fichier au format 'SALLELES' passé en paramètre avec les instructions
     de colonne à garder par onglet passées en paramètre. Renvoie les données lues dans un dict par onglet et dernière date lue
@@ -113,17 +185,35 @@ def lire_fic_salleles(fic, dico_param):
     """
     # lecture fichier excel selon le format indiqué dans les onglets spécifiés dans le dico param
     resultat = dict()
+    # le classeur est ouvert une seule fois pour tous les onglets, en lecture seule
+    classeur = openpyxl.load_workbook(fic, read_only=True, data_only=True, keep_links=False)
+    with pd.ExcelFile(classeur, engine='openpyxl') as xl:
+        dico_data_lue = dict()
+        for onglet in dico_param:
+            # lecture directe des valeurs des cellules
+            dico_data_lue[onglet] = _lire_onglet_salleles(classeur[onglet], dico_param[onglet])
+            if dico_data_lue[onglet] is not None:
+                continue
+            # lecture par pandas, qui renomme les en-têtes répétés et interprète les textes de valeurs manquantes
+            # nom de la colonne des dates : première colonne de l'onglet
+            col_date = pd.read_excel(xl, sheet_name=onglet, nrows=0).columns[0]
+            colonnes_utiles = set([col_date] + dico_param[onglet])
+            # seules les colonnes spécifiées en paramètre sont analysées, en simple précision ;
+            # une colonne absente est signalée par la sélection des colonnes ci-dessous
+            dico_data_lue[onglet] = pd.read_excel(xl,
+                                                  sheet_name=onglet,
+                                                  index_col=0,
+                                                  usecols=colonnes_utiles.__contains__,
+                                                  dtype={col: 'float32' for col in dico_param[onglet]},
+                                                  skiprows=[1])
     for onglet in dico_param:
-        data_lue = pd.read_excel(fic,
-                                 sheet_name=onglet,
-                                 parse_dates=True,
-                                 date_format='%d/%m/%Y %H:%M:%S',
-                                 index_col=0,
-                                 skiprows=[1])
-        # on conserve uniquement les colonnes spécifiées en paramètre
-        data_lue = data_lue[dico_param[onglet]]
-        # tri sur l'onglet
-        data_lue = data_lue.sort_index()
+        # colonnes remises dans l'ordre spécifié en paramètre
+        data_lue = dico_data_lue[onglet][dico_param[onglet]]
+        # conversion des dates avec un format explicite
+        data_lue.index = pd.to_datetime(data_lue.index, format=FORMAT_DATE, cache=True)
+        # tri sur l'onglet, inutile si les dates sont déjà dans l'ordre chronologique
+        if not data_lue.index.is_monotonic_increasing:
+            data_lue = data_lue.sort_index()
         # dernière date
         last_date = data_lue.index[-1]
         resultat[onglet] = dict()
@@ -149,24 +239,134 @@ def lire_fic_poste_central(fic, dico_param):
     # un seul onglet DATA à lire
     data_lue = pd.read_excel(fic,
                              sheet_name='DATA',
-                             parse_dates=True,
-                             date_format='%d/%m/%Y %H:%M:%S')
+                             usecols=['date', 'rank', 'value'],
+                             dtype={'rank': 'category', 'value': 'float32'})
+    # conversion des dates avec un format explicite
+    data_lue['date'] = pd.to_datetime(data_lue['date'], format=FORMAT_DATE, cache=True)
+    # ensemble des dates du fichier, tous paramètres confondus : la dernière date identifie le fichier
+    dates = pd.DatetimeIndex(data_lue['date'].unique(), name='date').sort_values()
+    last_date = dates[-1]
     # nom des paramètres dans la colonne 'rank :
-    # on crée un index en pivotant les valeurs de 'value' selon l'index 'date'
-    chronique_lue = data_lue.pivot(index='date', columns='rank', values='value')
-    # dernière date
-    last_date = chronique_lue.index[-1]
-
-    # filtre les données lues selon le rangement souhaité
+    # on ne conserve que les lignes des paramètres demandés pour toutes les stations
+    rangs_utiles = set().union(*dico_param.values())
+    data_lue = data_lue[data_lue['rank'].isin(rangs_utiles)]
+    # station de chaque paramètre, si aucun paramètre n'est partagé entre stations
+    rang_station = {rang: station for station in dico_param for rang in dico_param[station]}
+    if len(rang_station) < sum(len(rangs) for rangs in dico_param.values()):
+        # paramètres partagés : un seul pivot pour toutes les stations
+        # les catégories non utilisées ne doivent pas produire de colonnes lors du pivot
+        data_lue = data_lue.assign(rank=data_lue['rank'].cat.remove_unused_categories())
+        # on crée un index en pivotant les valeurs de 'value' selon l'index 'date',
+        # étendu à toutes les dates du fichier
+        chronique_lue = data_lue.pivot(index='date', columns='rank', values='value').reindex(dates)
+
+        # filtre les données lues selon le rangement souhaité
+        for station in dico_param:
+            resultat[station] = dict()
+            resultat[station][last_date] = chronique_lue[dico_param[station]]
+        # fin
+        return resultat
+
+    # paramètres propres à chaque station : un pivot par station, limité à ses paramètres
+    # toutes les séries partagent l'index de l'ensemble des dates du fichier et donc la dernière date
+    groupes = dict(list(data_lue.groupby(data_lue['rank'].map(rang_station).astype(str))))
     for station in dico_param:
+        groupe = groupes[station]
+        # les catégories des autres stations ne doivent pas produire de colonnes lors du pivot
+        groupe = groupe.assign(rank=groupe['rank'].cat.remove_unused_categories())
+        chronique_station = groupe.pivot(index='date', columns='rank', values='value')
         resultat[station] = dict()
-        resultat[station][last_date] = chronique_lue[dico_param[station]]
+        resultat[station][last_date] = chronique_station[dico_param[station]].reindex(dates)
     # fin
     return resultat
 
 #-------------------------------------------------------------------------------
 
-def lire_fichiers_excel(chemin_input, dico_param,format_donnees):
+# fonctions de lecture d'un fichier par format de données,
+# chacune renvoie les données sous la forme de dict[station][derniere_date] = dataframe_donnees_lues
+LECTEURS = {'SALLELES': lire_fic_salleles,
+            'POSTE_CENTRAL': lire_fic_poste_central}
+
+def _nom_fic_cache(fic, station, dossier_cache):
+    """Fonction interne donnant le nom du fichier parquet de cache associé à un fichier lu et une station
+
+    Args:
+        fic (str): nom du fichier excel lu
+        station (str): nom de la station extraite du fichier
+        dossier_cache (str): dossier du cache parquet
+
+    Returns:
+        str: nom du fichier parquet dans le dossier du cache, distinct pour deux fichiers excel de même nom
+    """
+    empreinte = hashlib.sha1(os.path.abspath(fic).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(dossier_cache, f"{os.path.basename(fic)}.{empreinte}.{station}.parquet")
+
+def _lire_fic_cache(fic, dico_param, lecteur, dossier_cache=None):
+    """Fonction interne de lecture d'un fichier en passant par un cache parquet optionnel :
+    si les fichiers parquet de toutes les stations sont plus récents que le fichier excel, ils sont relus à la place de ce dernier,
+    sinon le fichier excel est lu et le cache mis à jour si possible
+
+    Args:
+        fic (str): nom du fichier excel à lire
+        dico_param (dict): description des données à extraire selon le format du fichier
+        lecteur (function): fonction de lecture du fichier selon son format, issue de LECTEURS
+        dossier_cache (str, optional): dossier du cache parquet, pas de cache si None. Defaults to None.
+
+    Returns:
+        dict: données lues sous la forme de dict[station][derniere_date] = dataframe_donnees_lues
+    """
+    print('Lecture du fichier ',fic)
+    if dossier_cache is None:
+        return lecteur(fic, dico_param)
+    date_fic = os.path.getmtime(fic)
+    liste_cache = [_nom_fic_cache(fic, station, dossier_cache) for station in dico_param]
+    # relecture du cache s'il est à jour pour toutes les stations
+    if all(os.path.exists(fic_cache) and os.path.getmtime(fic_cache) >= date_fic for fic_cache in liste_cache):
+        try:
+            resultat = dict()
+            for station, fic_cache in zip(dico_param, liste_cache):
+                data_lue = pd.read_parquet(fic_cache, columns=dico_param[station])
+                # la dernière date est celle de la série enregistrée
+                resultat[station] = {data_lue.index[-1]: data_lue}
+            return resultat
+        except ValueError:
+            # colonnes demandées absentes du cache : relecture du fichier excel
+            pass
+    resultat = lecteur(fic, dico_param)
+    # mise à jour du cache, les noms de colonnes sont enregistrés sous forme de chaînes simples
+    try:
+        os.makedirs(dossier_cache, exist_ok=True)
+        for station, fic_cache in zip(dico_param, liste_cache):
+            for data_lue in resultat[station].values():
+                data_lue.set_axis(list(data_lue.columns), axis='columns').to_parquet(fic_cache,
+                                                                                     engine='pyarrow',
+                                                                                     compression='zstd')
+    except OSError as err:
+        # dossier du cache non accessible en écriture : on continue sans cache
+        print(f"ATTENTION, cache non mis à jour pour le fichier {fic} : {err}")
+    return resultat
+
+# lectures déjà faites au cours de la session, par clef renvoyée par _cle_lecture,
+# une seule lecture conservée par fichier
+_LECTURES_MEMORISEES = dict()
+
+def _cle_lecture(fic, dico_param, format_donnees):
+    """Fonction interne donnant la clef de mémorisation de la lecture d'un fichier :
+    la lecture est refaite si le fichier est modifié ou si les paramètres d'extraction changent
+
+    Args:
+        fic (str): nom du fichier excel à lire
+        dico_param (dict): description des données à extraire selon le format du fichier
+        format_donnees (str): format des données du fichier à lire
+
+    Returns:
+        tuple: (chemin absolu, date de modification en ns, taille, paramètres d'extraction, format)
+    """
+    stat_fic = os.stat(fic)
+    cle_param = tuple((station, tuple(colonnes)) for station, colonnes in dico_param.items())
+    return (os.path.abspath(fic), stat_fic.st_mtime_ns, stat_fic.st_size, cle_param, format_donnees)
+
+def lire_fichiers_excel(chemin_input, dico_param,format_donnees, dossier_cache=None):
     """lecture de l'ensemble des fichiers du chemin passé en paramètre,
     en faisant l'hypothèse qu'ils ont tous un format homogène et contiennent les paramètres indiqués sur les extractions à faire
 
@@ -174,41 +374,94 @@ def lire_fichiers_excel(chemin_input, dico_param,format_donnees):
         chemin_input (str): chemin vers tous les fichiers à extraire, pouvant contenir des caractères génériques du type '*' ou '?'
         dico_param (dict): description des données à extraire selon le format des fichiers excel concernés
         format_donnees (str): format des données des fichiers à lire, tous sont supposés être au même format
+        dossier_cache (str, optional): dossier du cache parquet des fichiers lus, pas de cache si None. Defaults to None.
 
     Returns:
-        dict: données lues dict[nom_station][derniere_date] = la série temporelle associée au nom de station et rangée dans un dataframe
+        dict: données lues dict[nom_station] = liste des (derniere_date, série temporelle associée au nom de station et rangée dans un dataframe),
+        triée par dernière date
     """
     # résultat
-    tab_data = dict()
-    # liste des fichiers à lire
-    liste_fic = glob.glob(chemin_input)
-    # boucle sur les fichiers et lecture selon le format de données
-    for fic in liste_fic:
-        print('Lecture du fichier ',fic)
-        if format_donnees == 'SALLELES':
-            # renvoie les données par clefs onglet/derniere_date
-            dico_data = lire_fic_salleles(fic, dico_param)
-
-        elif format_donnees == 'POSTE_CENTRAL':
-            dico_data = lire_fic_poste_central(fic, dico_param)
+    tab_data = defaultdict(list)
+    # dernières dates déjà lues par station, pour la détection des doublons
+    dates_lues = defaultdict(set)
+    # liste des fichiers à lire, hors fichiers de cache parquet
+    liste_fic = [fic for fic in glob.glob(chemin_input) if not fic.endswith('.parquet')]
+    # fonction de lecture selon le format de données, identique pour tous les fichiers
+    lecteur = LECTEURS[format_donnees]
+    # clefs de mémorisation des lectures, une seule lecture par clef
+    liste_cle = [_cle_lecture(fic, dico_param, format_donnees) for fic in liste_fic]
+    liste_cle_a_lire = list(dict.fromkeys(cle for cle in liste_cle if cle not in _LECTURES_MEMORISEES))
+    # lecture en parallèle des fichiers non encore lus
+    if liste_cle_a_lire:
+        with ProcessPoolExecutor() as executor:
+            liste_dico_data = executor.map(partial(_lire_fic_cache, dico_param=dico_param, lecteur=lecteur, dossier_cache=dossier_cache),
+                                           [cle[0] for cle in liste_cle_a_lire])
+            for cle, dico_data in zip(liste_cle_a_lire, liste_dico_data):
+                # les lectures précédentes du même fichier (modifié depuis ou autres paramètres) sont oubliées
+                for cle_ancienne in [c for c in _LECTURES_MEMORISEES if c[0] == cle[0]]:
+                    del _LECTURES_MEMORISEES[cle_ancienne]
+                _LECTURES_MEMORISEES[cle] = dico_data
+    liste_dico_data = [_LECTURES_MEMORISEES[cle] for cle in liste_cle]
+    # boucle sur les données lues, dans l'ordre des fichiers
+    for fic, dico_data in zip(liste_fic, liste_dico_data):
         # aggrégation des données lues
         for nom_station in dico_data:
-            if nom_station not in tab_data:
-                tab_data[nom_station] = dict()
-            # données d'une station
+            # données d'une station : liste de (derniere_date, dataframe) triée par dernière date
             data_station = tab_data[nom_station]
             # série temporelle lue traitée une seule fois par dernière date (on ne fait rien si doublon - print avertissement)
             for last_date in dico_data[nom_station]:
-                if last_date in data_station:
+                if last_date in dates_lues[nom_station]:
                     print(f"ATTENTION, fichier {fic} non traité : \n\t Doublon de date de fin, dernière date = {last_date}")
                     continue
-                # ajout des données au résultat
-                data_station[last_date] = dico_data[nom_station][last_date]
+                dates_lues[nom_station].add(last_date)
+                # ajout des données au résultat en conservant le tri de la liste
+                insort(data_station, (last_date, dico_data[nom_station][last_date]), key=itemgetter(0))
     # fin
-    return tab_data
+    return dict(tab_data)
 
 #-------------------------------------------------------------------------------
 
+def _fusionner_series(dates, valeurs):
+    """Fonction interne de fusion de séries concaténées dans l'ordre où elles s'écrasent :
+    pour chaque date, la dernière valeur non vide de chaque colonne est conservée
+
+    Args:
+        dates (ndarray): dates des séries concaténées, en entiers int64
+        valeurs (ndarray): valeurs des séries concaténées, une colonne par paramètre
+
+    Returns:
+        tuple: dates triées sans doublon et valeurs fusionnées associées
+    """
+    dates_fusion = np.unique(dates)
+    valeurs_fusion = np.full((dates_fusion.shape[0], valeurs.shape[1]), np.nan, dtype=valeurs.dtype)
+    positions = np.searchsorted(dates_fusion, dates)
+    for i in range(dates.shape[0]):
+        for j in range(valeurs.shape[1]):
+            if not np.isnan(valeurs[i, j]):
+                valeurs_fusion[positions[i], j] = valeurs[i, j]
+    return dates_fusion, valeurs_fusion
+
+if njit is not None:
+    _fusionner_series = njit(cache=True)(_fusionner_series)
+
+def _fusion_compilee_possible(list_data_station):
+    """Fonction interne indiquant si les séries d'une station peuvent être fusionnées par _fusionner_series compilée :
+    numba disponible, index de dates, mêmes colonnes et valeurs en simple précision
+
+    Args:
+        list_data_station (list): séries d'une station rangées par ordre chronologique des dernières dates
+
+    Returns:
+        bool: True si la fusion compilée est possible
+    """
+    if njit is None:
+        return False
+    colonnes = list_data_station[0].columns
+    return all(isinstance(df.index, pd.DatetimeIndex)
+               and df.columns.equals(colonnes)
+               and (df.dtypes == np.float32).all()
+               for df in list_data_station)
+
 def aggreger_donnees(tab_data):
     """Aggrégation des données passées en paramètre en respectant l'ordre des dernières dates des
     données lues pour chaque fichier (et série de données).
@@ -216,7 +469,7 @@ def aggreger_donnees(tab_data):
     de dernière date et chaque série écrase les données précédentes
 
     Args:
-        tab_data (dict): données lues et rangées par clef de station et clef de date
+        tab_data (dict): données lues et rangées par clef de station en listes de (derniere_date, dataframe) triées par dernière date
 
     Returns:
         dict: données traitées et rangées dans des dataframe par clef de date : dict[station] = dataframe
@@ -225,26 +478,49 @@ def aggreger_donnees(tab_data):
     resultat = dict()
     # parcours des noms de station
     for nom_station in tab_data:
-        # tri des dates lues
-        list_dernieres_dates = sorted(tab_data[nom_station])
+        # séries déjà rangées par ordre chronologique des dernières dates lues
+        list_data_station = [data_station for _, data_station in tab_data[nom_station]]
         # principe : les dernières dates lues écrasent les précédentes
-        for derniere_date in list_dernieres_dates:
-            # donnée à ajouter ou superposer
-            data_station = tab_data[nom_station][derniere_date]
-            # si nécessaire on supperpose
-            if nom_station in resultat:
-                # nouvel index : union des dates déjà lues et à ajouter
-                new_index = resultat[nom_station].index.union(data_station.index)
-                resultat[nom_station] = resultat[nom_station].reindex(index=new_index)
-                resultat[nom_station].update(data_station)
-            else:
-                # initialisation de l'ajout de la donnée la première fois
-                resultat[nom_station] = data_station
+        if _fusion_compilee_possible(list_data_station):
+            # fusion compilée sur les tableaux numpy des dates et des valeurs
+            dates, valeurs = _fusionner_series(np.concatenate([df.index.as_unit('ns').asi8 for df in list_data_station]),
+                                               np.concatenate([df.to_numpy() for df in list_data_station]))
+            premiere = list_data_station[0]
+            resultat[nom_station] = pd.DataFrame(valeurs,
+                                                 index=pd.DatetimeIndex(dates.view('M8[ns]'), name=premiere.index.name).as_unit(premiere.index.unit),
+                                                 columns=premiere.columns)
+        else:
+            # concaténation en une seule passe puis, pour chaque date, dernière valeur non vide de chaque colonne
+            resultat[nom_station] = pd.concat(list_data_station).groupby(level=0).last()
     # fin
     return resultat
 
 #-------------------------------------------------------------------------------
 
+def _ecrire_station(station_df, dossier_out):
+    """Fonction interne d'écriture des données d'une station dans un fichier dont le nom est basé sur la station
+
+    Args:
+        station_df (tuple): couple (station, df) des données à écrire
+        dossier_out (str): emplacement de l'écriture des données, supposé existant
+    """
+    station, df = station_df
+    # nom du fichier d'export, compressé
+    nom_fic = os.path.join(dossier_out, f"export_{station}_.csv.gz")
+    df.index.name = 'date'
+    print("enregistrement de : ", nom_fic)
+    # écriture par pyarrow, les réels sont écrits au plus court sans perte de précision
+    table = pa.Table.from_pandas(df.reset_index(), preserve_index=False)
+    try:
+        # dates écrites à la seconde, comme le fait pandas, si aucune ne comporte de fraction de seconde
+        table = table.set_column(0, 'date', table.column(0).cast(pa.timestamp('s')))
+    except pa.ArrowInvalid:
+        pass
+    with pa.CompressedOutputStream(nom_fic, 'gzip') as sortie:
+        # en-tête écrit sans guillemets
+        sortie.write((';'.join(map(str, table.column_names)) + '\n').encode('utf-8'))
+        pa_csv.write_csv(table, sortie, write_options=pa_csv.WriteOptions(include_header=False, delimiter=';'))
+
 def ecrire_donnees_traitees(tab_data, dossier_out):
     """Ecriture des données dans les fichiers dont les noms sont basés sur les stations indiquées en clé
 
@@ -256,14 +532,9 @@ def ecrire_donnees_traitees(tab_data, dossier_out):
     if not os.path.exists(dossier_out):
         print("crétion des dossiers manquant :", dossier_out)
         os.makedirs(dossier_out, exist_ok=True)
-    # parcours des données à écrire et export dans des fichiers par station (clé de tab_data)
-    for station in tab_data:
-        # nom du fichier d'export
-        nom_fic = os.path.join(dossier_out, f"export_{station}_.csv")
-        df = tab_data[station]
-        df.index.name = 'date'
-        print("enregistrement de : ", nom_fic)
-        df.to_csv(nom_fic, sep=';')
+    # export en parallèle dans des fichiers par station (clé de tab_data)
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        list(executor.map(partial(_ecrire_station, dossier_out=dossier_out), tab_data.items()))
 
 #-------------------------------------------------------------------------------
 #-------------------------------------------------------------------------------
@@ -282,7 +553,7 @@ def main():
 
     # lecture des fichiers selon le format de données
     format_donnees = params['FORMAT_DONNEES']
-    tab_data = lire_fichiers_excel(params['FICHIERS_INPUT'], params[format_donnees],format_donnees)
+    tab_data = lire_fichiers_excel(params['FICHIERS_INPUT'], params[format_donnees],format_donnees, params['DOSSIER_CACHE'])
 
     # aggrégation des fichiers multiples par station
     tab_data = aggreger_donnees(tab_data)